@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Simple Serial Terminal Log Analyzer
+Streaming offline analysis of large terminal logs and raw captures
+"""
+
+import argparse
+import calendar
+import csv
+import mmap
+import os
+import re
+import shutil
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Log lines look like "[2025-07-31 14:30:25.123] RECEIVED: ..." (see log_to_file()).
+# RUN_PATTERN matches a whole run of consecutive lines from the same second, so
+# the per-line work happens inside the regex engine instead of in Python.
+# Group 2 is the first millisecond value of the run, group 3 the last.
+RUN_PATTERN = re.compile(
+    rb'^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\.(\d{3})\][^\n]*(?:\n\[\1\.(\d{3})\][^\n]*)*', re.M)
+TIMESTAMP_PATTERN = re.compile(rb'^\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d\.\d{3})\]', re.M)
+# The message type sits right after the 25 character "[timestamp]" prefix;
+# anchoring it there keeps "] ERROR: " inside message text from being counted
+TYPE_PATTERN = re.compile(rb'^\[[^\]\n]{23}\] ([A-Z]+): ', re.M)
+
+MESSAGE_TYPES = ["SENT", "RECEIVED", "ERROR", "SUCCESS", "SYSTEM", "INFO", "DECODED"]
+KNOWN_TYPES = {kind.encode('ascii'): kind for kind in MESSAGE_TYPES}
+
+# Each worker scans its chunk in blocks so match lists stay small
+BLOCK_SIZE = 16 * 1024 * 1024
+MIN_CHUNK_SIZE = 4 * 1024 * 1024
+# Raw captures are not line aligned; scan this far past a block end so
+# pattern matches that straddle a boundary are still counted
+RAW_OVERLAP = 4096
+
+
+def to_epoch(second):
+    """Convert a 'YYYY-MM-DD HH:MM:SS' byte string to seconds (log wall clock)"""
+    return calendar.timegm(time.strptime(second.decode('ascii'), '%Y-%m-%d %H:%M:%S'))
+
+
+def format_epoch(seconds):
+    """Format seconds from to_epoch() back into log wall clock time"""
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(seconds))
+
+
+def format_epoch_ms(milliseconds):
+    """Format milliseconds from to_epoch() with millisecond precision"""
+    return f"{format_epoch(milliseconds // 1000)}.{milliseconds % 1000:03d}"
+
+
+def split_chunks(filename, chunk_count, raw):
+    """Split a file into (start, end) ranges, aligned on line starts for logs"""
+    size = os.path.getsize(filename)
+    if size == 0:
+        return []
+    chunk_size = max(MIN_CHUNK_SIZE, size // chunk_count + 1)
+    if raw:
+        return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+
+    chunks = []
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            end = mm.find(b'\n', min(start + chunk_size, size) - 1)
+            end = size if end < 0 else end + 1
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def analyze_chunk(filename, start, end, options):
+    """Analyze one chunk of a file (runs in a worker process)"""
+    result = {
+        "seconds": Counter(),
+        "pattern_hits": Counter(),
+        "gaps": [],
+        "first_ms": None,
+        "last_ms": None,
+    }
+    patterns = [re.compile(p) for p in options["patterns"]]
+    grep = re.compile(options["grep"]) if options["grep"] else None
+    since, until = options["since"], options["until"]
+    slice_file = open(options["slice_path"], 'wb') if options["slice_path"] else None
+
+    seconds = Counter()
+    epochs = {}
+    prev_ms = None
+    gap_ms = options["gap_ms"]
+
+    with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        block_start = start
+        try:
+            while block_start < end:
+                block_end = min(block_start + BLOCK_SIZE, end)
+                if options["raw"]:
+                    scan_end = min(block_end + RAW_OVERLAP, size)
+                else:
+                    # Keep blocks line aligned
+                    newline = mm.find(b'\n', block_end - 1, end)
+                    block_end = end if newline < 0 else newline + 1
+                    scan_end = block_end
+                block = mm[block_start:scan_end]
+                length = block_end - block_start
+
+                # Pattern hit counts
+                for pattern in patterns:
+                    if scan_end == block_end:
+                        hits = len(pattern.findall(block))
+                    else:
+                        # Only count matches starting before the overlap
+                        hits = 0
+                        for match in pattern.finditer(block):
+                            if match.start() >= length:
+                                break
+                            hits += 1
+                    result["pattern_hits"][pattern.pattern] += hits
+
+                if not options["raw"]:
+                    for run in RUN_PATTERN.finditer(block):
+                        second, first_millis, last_millis = run.groups()
+                        run_start, run_end = run.span()
+
+                        # Per-type counts for this second
+                        lines = block.count(b'\n', run_start, run_end) + 1
+                        for kind, count in Counter(TYPE_PATTERN.findall(block, run_start, run_end)).items():
+                            seconds[second, KNOWN_TYPES.get(kind, "OTHER")] += count
+                            lines -= count
+                        if lines > 0:
+                            seconds[second, "OTHER"] += lines
+
+                        # Entries within a run are less than a second apart,
+                        # so gaps can only fall between runs
+                        base = epochs.get(second)
+                        if base is None:
+                            base = epochs[second] = to_epoch(second) * 1000
+                        if prev_ms is None:
+                            result["first_ms"] = base + int(first_millis)
+                        elif base + int(first_millis) - prev_ms >= gap_ms:
+                            result["gaps"].append((prev_ms, base + int(first_millis)))
+                        prev_ms = base + int(last_millis or first_millis)
+
+                    if slice_file:
+                        write_slice(block, grep, since, until, slice_file)
+
+                block_start = block_end
+        finally:
+            if slice_file:
+                slice_file.close()
+    result["last_ms"] = prev_ms
+
+    # Convert keys to epochs here so the parent only has to merge
+    result["seconds"] = Counter({(epochs[second] // 1000, kind): count
+                                 for (second, kind), count in seconds.items()})
+    return result
+
+
+def write_slice(block, grep, since, until, out):
+    """Write lines of a block matching the regex and time range to out"""
+    def in_range(line_start):
+        if since is None and until is None:
+            return True
+        if block[line_start:line_start + 1] != b'[':
+            return False
+        stamp = block[line_start + 1:line_start + 24]
+        return (since is None or stamp >= since) and (until is None or stamp < until)
+
+    if grep is None:
+        # Time range only: walk the timestamped lines
+        for match in TIMESTAMP_PATTERN.finditer(block):
+            stamp = match.group(1)
+            if (since is not None and stamp < since) or (until is not None and stamp >= until):
+                continue
+            line_end = block.find(b'\n', match.end())
+            line_end = len(block) if line_end < 0 else line_end + 1
+            out.write(block[match.start():line_end])
+        return
+
+    emitted_until = 0
+    for match in grep.finditer(block):
+        if match.start() < emitted_until:
+            # Line already written for an earlier match
+            continue
+        line_start = block.rfind(b'\n', 0, match.start()) + 1
+        line_end = block.find(b'\n', match.start())
+        line_end = len(block) if line_end < 0 else line_end + 1
+        if in_range(line_start):
+            out.write(block[line_start:line_end])
+        emitted_until = line_end
+
+
+def merge_results(results, options):
+    """Merge per-chunk results (in file order) into one summary"""
+    merged = {
+        "seconds": Counter(),
+        "pattern_hits": Counter(),
+        "gaps": [],
+        "first_ms": None,
+        "last_ms": None,
+    }
+    for result in results:
+        merged["seconds"].update(result["seconds"])
+        merged["pattern_hits"].update(result["pattern_hits"])
+
+        # A gap can span the boundary between two chunks
+        if result["first_ms"] is not None:
+            if merged["last_ms"] is not None and result["first_ms"] - merged["last_ms"] >= options["gap_ms"]:
+                merged["gaps"].append((merged["last_ms"], result["first_ms"]))
+            if merged["first_ms"] is None:
+                merged["first_ms"] = result["first_ms"]
+            merged["last_ms"] = result["last_ms"]
+        merged["gaps"].extend(result["gaps"])
+
+    merged["types"] = Counter()
+    for (_, kind), count in merged["seconds"].items():
+        merged["types"][kind] += count
+    merged["entries"] = sum(merged["types"].values())
+    return merged
+
+
+def throughput_rows(seconds, interval):
+    """Bucket per-second counts into rows of (interval_start, {type: count})"""
+    buckets = {}
+    for (second, kind), count in seconds.items():
+        bucket = buckets.setdefault(second - second % interval, Counter())
+        bucket[kind] += count
+    return sorted(buckets.items())
+
+
+def export_throughput(rows, path, fmt):
+    """Export the throughput table as CSV or Parquet"""
+    kinds = MESSAGE_TYPES + ["OTHER"]
+    header = ["interval_start"] + kinds + ["total"]
+
+    if fmt == "csv":
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for start, counts in rows:
+                writer.writerow([format_epoch(start)] + [counts[kind] for kind in kinds] + [sum(counts.values())])
+        return
+
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise SystemExit("Parquet export requires pyarrow (pip install pyarrow)")
+    columns = {"interval_start": [format_epoch(start) for start, _ in rows]}
+    for kind in kinds:
+        columns[kind] = [counts[kind] for _, counts in rows]
+    columns["total"] = [sum(counts.values()) for _, counts in rows]
+    pyarrow.parquet.write_table(pyarrow.table(columns), path)
+
+
+def parse_time(value):
+    """Parse a --since/--until value into a log timestamp that compares as bytes"""
+    for fmt in ('%Y-%m-%d %H:%M:%S.%f', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d'):
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        return f"{parsed.strftime('%Y-%m-%d %H:%M:%S')}.{parsed.microsecond // 1000:03d}".encode('ascii')
+    raise argparse.ArgumentTypeError(f"invalid time: {value!r} (use 'YYYY-MM-DD HH:MM:SS')")
+
+
+def print_report(filename, merged, rows, options, elapsed, max_gaps):
+    """Print the analysis summary"""
+    size = os.path.getsize(filename)
+    print(f"File: {filename}")
+    print(f"Size: {size:,} bytes, analyzed in {elapsed:.2f}s ({size / max(elapsed, 1e-9) / 1e6:.1f} MB/s)")
+
+    if not options["raw"]:
+        print(f"Entries: {merged['entries']:,}")
+        if merged["first_ms"] is not None:
+            print(f"Time span: {format_epoch_ms(merged['first_ms'])} - {format_epoch_ms(merged['last_ms'])}")
+
+        print("\nMessage types:")
+        for kind, count in merged["types"].most_common():
+            print(f"  {kind:<10} {count:>12,}")
+
+        if rows:
+            totals = [sum(counts.values()) for _, counts in rows]
+            peak = max(range(len(rows)), key=totals.__getitem__)
+            print(f"\nThroughput ({options['interval']}s intervals):")
+            print(f"  Intervals with data: {len(rows):,}")
+            print(f"  Average: {sum(totals) / len(rows):,.1f} entries/interval")
+            print(f"  Peak: {totals[peak]:,} entries at {format_epoch(rows[peak][0])}")
+
+        gaps = merged["gaps"]
+        print(f"\nGaps >= {options['gap_ms'] / 1000:g}s: {len(gaps):,}")
+        for gap_start, gap_end in sorted(gaps, key=lambda g: g[0] - g[1])[:max_gaps]:
+            print(f"  {format_epoch_ms(gap_start)} -> {format_epoch_ms(gap_end)} "
+                  f"({(gap_end - gap_start) / 1000:.3f}s)")
+        if len(gaps) > max_gaps:
+            print(f"  ... {len(gaps) - max_gaps:,} more")
+
+    if merged["pattern_hits"]:
+        print("\nPattern hits:")
+        for pattern, hits in merged["pattern_hits"].items():
+            print(f"  {pattern.decode('utf-8', errors='replace')}: {hits:,}")
+
+
+def main():
+    """Main function to run the log analyzer"""
+    parser = argparse.ArgumentParser(
+        description="Analyze Simple Serial Terminal logs (terminal_log_*.txt) or raw captures")
+    parser.add_argument("file", help="log file or raw capture to analyze")
+    parser.add_argument("--raw", action="store_true",
+                        help="treat the file as a raw capture (byte counts and pattern hits only)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--interval", type=int, default=1,
+                        help="throughput interval in seconds (default: 1)")
+    parser.add_argument("--gap", type=float, default=5.0,
+                        help="report gaps between entries of at least this many seconds (default: 5, minimum: 1)")
+    parser.add_argument("--max-gaps", type=int, default=20,
+                        help="number of largest gaps to print (default: 20)")
+    parser.add_argument("--pattern", action="append", default=[],
+                        help="regex to count hits for (may be repeated)")
+    parser.add_argument("--since", type=parse_time, help="slice start time 'YYYY-MM-DD HH:MM:SS'")
+    parser.add_argument("--until", type=parse_time, help="slice end time, exclusive")
+    parser.add_argument("--grep", help="regex selecting lines for the slice")
+    parser.add_argument("--slice-out", help="write lines selected by --since/--until/--grep to this file")
+    parser.add_argument("--export", help="export the throughput table to this file")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv",
+                        help="export format (default: csv, parquet requires pyarrow)")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.file):
+        parser.error(f"file not found: {args.file}")
+    if args.interval < 1:
+        parser.error("--interval must be at least 1 second")
+    if args.gap < 1:
+        parser.error("--gap must be at least 1 second")
+    filtering = args.since is not None or args.until is not None or args.grep is not None
+    if filtering and not args.slice_out:
+        parser.error("--since/--until/--grep require --slice-out")
+    if args.slice_out and not filtering:
+        parser.error("--slice-out requires --since, --until or --grep")
+    if args.raw and (filtering or args.export):
+        parser.error("raw captures have no timestamps; only --pattern is supported")
+    try:
+        for pattern in args.pattern + ([args.grep] if args.grep else []):
+            re.compile(pattern.encode('utf-8'))
+    except re.error as e:
+        parser.error(f"invalid regex: {e}")
+
+    options = {
+        "raw": args.raw,
+        "interval": args.interval,
+        "gap_ms": int(args.gap * 1000),
+        "patterns": [p.encode('utf-8') for p in args.pattern],
+        "grep": args.grep.encode('utf-8') if args.grep else None,
+        "since": args.since,
+        "until": args.until,
+        "slice_path": None,
+    }
+
+    started = time.perf_counter()
+    workers = max(1, args.workers)
+    # Several chunks per worker so uneven chunks still balance across cores
+    chunks = split_chunks(args.file, workers * 4, args.raw)
+
+    jobs = []
+    for index, (start, end) in enumerate(chunks):
+        chunk_options = dict(options)
+        if args.slice_out:
+            chunk_options["slice_path"] = f"{args.slice_out}.part{index}"
+        jobs.append((args.file, start, end, chunk_options))
+
+    if workers == 1 or len(jobs) <= 1:
+        results = [analyze_chunk(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyze_chunk, *zip(*jobs)))
+
+    merged = merge_results(results, options)
+    rows = throughput_rows(merged["seconds"], args.interval)
+
+    if args.slice_out:
+        # Concatenate the per-chunk slices in file order
+        with open(args.slice_out, 'wb') as out:
+            for _, _, _, chunk_options in jobs:
+                with open(chunk_options["slice_path"], 'rb') as part:
+                    shutil.copyfileobj(part, out)
+                os.remove(chunk_options["slice_path"])
+
+    if args.export:
+        export_throughput(rows, args.export, args.format)
+
+    elapsed = time.perf_counter() - started
+    print_report(args.file, merged, rows, options, elapsed, args.max_gaps)
+    if args.slice_out:
+        print(f"\nSlice written to: {args.slice_out}")
+    if args.export:
+        print(f"Throughput exported to: {args.export}")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,23 +8,756 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
 import serial
 import serial.tools.list_ports
+import serial.rfc2217
 import threading
 import time
 from datetime import datetime
+from functools import reduce
+import json
+import operator
 import queue
+import socket
+import struct
 import sys
 
+class BridgePortGuard:
+    """Serial port wrapper handed to the RFC 2217 port manager of one client
+    
+    Port settings and control lines (DTR, RTS, break) changed by the client
+    are applied and reported through on_change(name, value, applied), or
+    refused when allow_settings is False; the client is then told the current
+    value. The port is shared, so purge requests must not discard data the GUI
+    or other clients have not read yet. on_purge() clears the client's own send
+    queue instead. Ports without modem control (e.g. ptys) raise OSError when a
+    line is read or set. Reads report the line as inactive and sets are
+    ignored, so clients can still negotiate.
+    """
+    SETTINGS = ('baudrate', 'bytesize', 'parity', 'stopbits', 'xonxoff', 'rtscts',
+                'dtr', 'rts', 'break_condition')
+    MODEM_LINES = ('cts', 'dsr', 'ri', 'cd', 'dtr', 'rts', 'break_condition')
+    
+    def __init__(self, ser, allow_settings=True, on_change=None, on_purge=None):
+        object.__setattr__(self, '_ser', ser)
+        object.__setattr__(self, '_allow_settings', allow_settings)
+        object.__setattr__(self, '_on_change', on_change or (lambda name, value, applied: None))
+        object.__setattr__(self, '_on_purge', on_purge or (lambda: None))
+    
+    def __getattr__(self, name):
+        try:
+            return getattr(self._ser, name)
+        except OSError:
+            if name in self.MODEM_LINES:
+                return False
+            raise
+    
+    def __setattr__(self, name, value):
+        if name in self.SETTINGS:
+            if getattr(self._ser, name) == value:
+                return
+            if self._allow_settings:
+                try:
+                    setattr(self._ser, name, value)
+                except OSError:
+                    if name not in self.MODEM_LINES:
+                        raise
+            self._on_change(name, value, self._allow_settings)
+            return
+        setattr(self._ser, name, value)
+    
+    def reset_input_buffer(self):
+        self._on_purge()
+    
+    def reset_output_buffer(self):
+        # Client data is written to the port as it arrives, nothing is pending
+        pass
+
+class BridgeClient:
+    """A TCP client attached to the serial bridge"""
+    def __init__(self, sock, address, queue_size):
+        self.sock = sock
+        self.address = f"{address[0]}:{address[1]}"
+        self.send_queue = queue.Queue(maxsize=queue_size)
+        self.send_lock = threading.Lock()
+        self.port_manager = None
+        
+        # Per-client statistics
+        self.sent_bytes = 0
+        self.dropped_chunks = 0
+        self.dropped_bytes = 0
+        self.last_loss_report = 0.0
+    
+    def write(self, data):
+        """Write directly to the socket (used for RFC 2217 negotiation)"""
+        with self.send_lock:
+            self.sock.sendall(data)
+
+class SerialBridge:
+    """Share an open serial port with clients on a local TCP socket
+    
+    Every client gets a copy of the received data. The same bytes object is
+    queued for each client and every client has its own bounded queue, so a
+    slow client loses data instead of stalling the serial reader or the GUI.
+    Writes from clients are serialized through the terminal's write lock.
+    In RFC 2217 mode, port settings and control line changes from clients are
+    reported through notify() and on_settings_change(), or refused unless
+    allow_settings is set. Purge requests only affect the requesting client.
+    """
+    LOSS_REPORT_INTERVAL = 5.0
+    
+    def __init__(self, ser, write_lock, port=7000, host="127.0.0.1",
+                 rfc2217=False, queue_size=256, notify=None,
+                 allow_settings=True, on_settings_change=None):
+        self.ser = ser
+        self.write_lock = write_lock
+        self.host = host
+        self.port = port
+        self.rfc2217 = rfc2217
+        self.queue_size = queue_size
+        self.notify = notify or (lambda message, msg_type: None)
+        self.allow_settings = allow_settings
+        self.on_settings_change = on_settings_change or (lambda: None)
+        
+        self.server_socket = None
+        self.running = False
+        # Replaced (never mutated) on connect/disconnect so publish() needs no lock
+        self.clients = ()
+        self.clients_lock = threading.Lock()
+    
+    def start(self):
+        """Open the listening socket and start accepting clients"""
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if sys.platform == "win32":
+            # SO_REUSEADDR on Windows would let another process steal the port
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((self.host, self.port))
+        self.server_socket.listen(5)
+        # Report the real port when an ephemeral port (0) was requested
+        self.port = self.server_socket.getsockname()[1]
+        self.running = True
+        
+        accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        accept_thread.start()
+    
+    def stop(self):
+        """Stop accepting clients and disconnect everyone"""
+        self.running = False
+        if self.server_socket:
+            try:
+                # shutdown() wakes up the blocked accept() on Linux
+                self.server_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                self.server_socket.close()
+            except OSError:
+                pass
+            self.server_socket = None
+        for client in self.clients:
+            self._remove_client(client)
+    
+    def publish(self, data):
+        """Queue received serial data for every client (called by the read thread)"""
+        for client in self.clients:
+            try:
+                client.send_queue.put_nowait(data)
+            except queue.Full:
+                client.dropped_chunks += 1
+                client.dropped_bytes += len(data)
+                now = time.monotonic()
+                if now - client.last_loss_report >= self.LOSS_REPORT_INTERVAL:
+                    client.last_loss_report = now
+                    self.notify(f"TCP client {client.address} is too slow, "
+                                f"{client.dropped_bytes} bytes dropped so far", "ERROR")
+    
+    def client_stats(self):
+        """Return (address, sent_bytes, dropped_bytes) for each connected client"""
+        return [(c.address, c.sent_bytes, c.dropped_bytes) for c in self.clients]
+    
+    def _accept_loop(self):
+        """Accept incoming connections until the bridge is stopped"""
+        while self.running:
+            try:
+                sock, address = self.server_socket.accept()
+            except OSError:
+                break
+            
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            client = BridgeClient(sock, address, self.queue_size)
+            if self.rfc2217:
+                try:
+                    guard = BridgePortGuard(
+                        self.ser,
+                        allow_settings=self.allow_settings,
+                        on_change=lambda name, value, applied, client=client:
+                            self._report_setting(client, name, value, applied),
+                        on_purge=lambda client=client: self._purge_client(client))
+                    client.port_manager = serial.rfc2217.PortManager(guard, client)
+                except Exception as e:
+                    self.notify(f"RFC 2217 negotiation with {client.address} failed: {e}", "ERROR")
+                    sock.close()
+                    continue
+            
+            with self.clients_lock:
+                self.clients = self.clients + (client,)
+            self.notify(f"TCP client connected: {client.address}", "SYSTEM")
+            
+            threading.Thread(target=self._send_loop, args=(client,), daemon=True).start()
+            threading.Thread(target=self._receive_loop, args=(client,), daemon=True).start()
+    
+    def _send_loop(self, client):
+        """Forward queued serial data to one client"""
+        while True:
+            try:
+                data = client.send_queue.get(timeout=1.0)
+            except queue.Empty:
+                if client.port_manager:
+                    try:
+                        client.port_manager.check_modem_lines()
+                    except OSError:
+                        break
+                continue
+            
+            if data is None:
+                break
+            if client.port_manager:
+                # Telnet IAC escaping, equivalent to PortManager.escape()
+                data = data.replace(b'\xff', b'\xff\xff')
+            try:
+                client.write(data)
+                client.sent_bytes += len(data)
+            except OSError:
+                break
+        self._remove_client(client)
+    
+    def _receive_loop(self, client):
+        """Write data from one client to the serial port"""
+        while True:
+            try:
+                data = client.sock.recv(4096)
+            except OSError:
+                break
+            if not data:
+                break
+            
+            if client.port_manager:
+                data = b''.join(client.port_manager.filter(data))
+                if not data:
+                    continue
+            try:
+                # One chunk per lock so writes from different clients never interleave
+                with self.write_lock:
+                    self.ser.write(data)
+            except Exception as e:
+                self.notify(f"TCP client {client.address} write error: {e}", "ERROR")
+                break
+        self._remove_client(client)
+    
+    def _report_setting(self, client, name, value, applied):
+        """Report a port settings change requested by an RFC 2217 client"""
+        if applied:
+            self.notify(f"TCP client {client.address} changed {name} to {value}", "SYSTEM")
+            self.on_settings_change()
+        else:
+            self.notify(f"TCP client {client.address} was refused changing {name} to {value}", "ERROR")
+    
+    def _purge_client(self, client):
+        """Discard the serial data still queued for one client"""
+        while True:
+            try:
+                data = client.send_queue.get_nowait()
+            except queue.Empty:
+                return
+            if data is None:
+                # Keep the sender thread's stop request
+                client.send_queue.put_nowait(None)
+                return
+    
+    def _remove_client(self, client):
+        """Disconnect a client and report its losses"""
+        with self.clients_lock:
+            if client not in self.clients:
+                return
+            self.clients = tuple(c for c in self.clients if c is not client)
+        
+        # Wake up the sender thread
+        try:
+            client.send_queue.put_nowait(None)
+        except queue.Full:
+            pass
+        try:
+            client.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        client.sock.close()
+        
+        summary = f"TCP client disconnected: {client.address} ({client.sent_bytes} bytes sent"
+        if client.dropped_bytes:
+            summary += f", {client.dropped_bytes} bytes in {client.dropped_chunks} chunks dropped"
+        self.notify(summary + ")", "ERROR" if client.dropped_bytes else "SYSTEM")
+
+def _build_crc16_table():
+    """Build the lookup table for the Modbus CRC-16 (polynomial 0xA001)"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+def _build_crc16_pair_table(table):
+    """Build the lookup table for two bytes at a time, indexed by crc ^ word"""
+    pairs = []
+    for word in range(65536):
+        crc = (word >> 8) ^ table[word & 0xFF]
+        pairs.append((crc >> 8) ^ table[crc & 0xFF])
+    return tuple(pairs)
+
+MODBUS_CRC_TABLE = _build_crc16_table()
+# Native 16-bit words match the CRC's byte order only on little-endian machines
+MODBUS_CRC_PAIR_TABLE = _build_crc16_pair_table(MODBUS_CRC_TABLE) if sys.byteorder == "little" else ()
+
+def modbus_crc16(data, crc=0xFFFF):
+    """Table-driven Modbus CRC-16; a frame including its CRC yields 0
+    
+    Two bytes are folded in per lookup where possible, which halves the cost
+    of the CRC checks the Modbus framer runs at every junk position.
+    """
+    data = memoryview(data)
+    paired = len(data) & ~1 if MODBUS_CRC_PAIR_TABLE else 0
+    if paired:
+        pair_table = MODBUS_CRC_PAIR_TABLE
+        for word in data[:paired].cast('H'):
+            crc = pair_table[crc ^ word]
+    table = MODBUS_CRC_TABLE
+    for byte in data[paired:]:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+class LineFramer:
+    """Split a byte stream into lines"""
+    def __init__(self, terminator=b'\n', max_length=1024):
+        self.terminator = terminator
+        self.max_length = max_length
+        self.buffer = bytearray()
+    
+    def reset(self):
+        self.buffer.clear()
+    
+    def feed(self, data):
+        """Return the complete lines in data, without terminators"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        start = 0
+        while True:
+            end = buffer.find(self.terminator, start)
+            if end < 0:
+                break
+            frames.append(bytes(buffer[start:end]))
+            start = end + len(self.terminator)
+        del buffer[:start]
+        
+        # Resync if the line ending never arrives
+        if len(buffer) > self.max_length:
+            frames.append(bytes(buffer))
+            buffer.clear()
+        return frames
+
+class SyncFramer:
+    """Split a byte stream into fixed-length frames, optionally after a sync pattern"""
+    def __init__(self, length, sync=b''):
+        self.length = len(sync) + length
+        self.sync = sync
+        self.buffer = bytearray()
+    
+    def reset(self):
+        self.buffer.clear()
+    
+    def feed(self, data):
+        """Return the complete frames in data, including the sync pattern"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        start = 0
+        while True:
+            if self.sync:
+                found = buffer.find(self.sync, start)
+                if found < 0:
+                    # Keep a possible partial sync pattern at the end
+                    start = max(start, len(buffer) - len(self.sync) + 1)
+                    break
+                start = found
+            if len(buffer) - start < self.length:
+                break
+            frames.append(bytes(buffer[start:start + self.length]))
+            start += self.length
+        del buffer[:start]
+        return frames
+
+# Function code -> (fixed frame lengths, (byte count offset, frame bytes besides the data))
+MODBUS_FRAME_LAYOUTS = {
+    1: ((8,), ((2, 5),)),
+    2: ((8,), ((2, 5),)),
+    3: ((8,), ((2, 5),)),
+    4: ((8,), ((2, 5),)),
+    5: ((8,), ()),
+    6: ((8,), ()),
+    7: ((4, 5), ()),
+    8: ((8,), ()),
+    11: ((4, 8), ()),
+    15: ((8,), ((6, 9),)),
+    16: ((8,), ((6, 9),)),
+    17: ((4,), ((2, 5),)),
+    23: ((), ((2, 5), (10, 13))),
+}
+
+MODBUS_FUNCTIONS = {
+    1: "Read Coils",
+    2: "Read Discrete Inputs",
+    3: "Read Holding Registers",
+    4: "Read Input Registers",
+    5: "Write Single Coil",
+    6: "Write Single Register",
+    7: "Read Exception Status",
+    8: "Diagnostics",
+    11: "Get Comm Event Counter",
+    15: "Write Multiple Coils",
+    16: "Write Multiple Registers",
+    17: "Report Server ID",
+    23: "Read/Write Multiple Registers",
+}
+
+MODBUS_EXCEPTIONS = {
+    1: "Illegal Function",
+    2: "Illegal Data Address",
+    3: "Illegal Data Value",
+    4: "Server Device Failure",
+    5: "Acknowledge",
+    6: "Server Device Busy",
+    8: "Memory Parity Error",
+    10: "Gateway Path Unavailable",
+    11: "Gateway Target Failed to Respond",
+}
+
+class ModbusRtuFramer:
+    """Split a Modbus RTU byte stream into frames
+    
+    RTU frames are delimited by 3.5 character silences, which the polling read
+    loop cannot see. Instead, candidate lengths are derived from the function
+    code and byte count fields and confirmed with the CRC. Bytes that do not
+    start a valid frame are collected and returned as one junk frame.
+    """
+    MAX_FRAME = 256
+    
+    def __init__(self):
+        self.buffer = bytearray()
+        self.junk = bytearray()
+        # Stream offset of buffer[0], and for positions already checked, the
+        # stream length needed before checking again (None: never a frame).
+        # Without this, resync scans would redo the CRCs on every call
+        self.offset = 0
+        self.checked = {}
+    
+    def reset(self):
+        self.buffer.clear()
+        self.junk.clear()
+        self.offset = 0
+        self.checked.clear()
+    
+    def frame_lengths(self, buffer, start):
+        """Return possible frame lengths at start, or None if more data is needed"""
+        function = buffer[start + 1]
+        if function & 0x80:
+            return (5,)
+        layout = MODBUS_FRAME_LAYOUTS.get(function)
+        if layout is None:
+            return ()
+        fixed, counted = layout
+        lengths = list(fixed)
+        for offset, extra in counted:
+            if start + offset >= len(buffer):
+                return None
+            lengths.append(buffer[start + offset] + extra)
+        return sorted(length for length in set(lengths) if length <= self.MAX_FRAME)
+    
+    def match_frame(self, buffer, view, start):
+        """Return (length of a CRC-valid frame at start or 0, buffer length needed
+        before another candidate can be checked or 0 if there are none left)"""
+        lengths = self.frame_lengths(buffer, start)
+        if lengths is None:
+            return 0, len(buffer) + 1
+        
+        # Extend the CRC incrementally over the candidate lengths
+        crc = 0xFFFF
+        checked = 0
+        for length in lengths:
+            if start + length > len(buffer):
+                return 0, start + length
+            crc = modbus_crc16(view[start + checked:start + length], crc)
+            checked = length
+            if crc == 0:
+                return length, False
+        return 0, False
+    
+    def check_frame(self, buffer, view, start):
+        """match_frame(), skipping positions already checked against the same data"""
+        position = self.offset + start
+        if position in self.checked:
+            needed = self.checked[position]
+            if needed is None:
+                return 0, 0
+            if self.offset + len(buffer) < needed:
+                return 0, needed - self.offset
+        length, needed = self.match_frame(buffer, view, start)
+        if not length:
+            self.checked[position] = self.offset + needed if needed else None
+        return length, needed
+    
+    def feed(self, data):
+        """Return the complete frames in data"""
+        buffer = self.buffer
+        buffer += data
+        frames = []
+        start = 0
+        view = memoryview(buffer)
+        try:
+            while len(buffer) - start >= 4:
+                length, waiting = self.check_frame(buffer, view, start)
+                if waiting:
+                    # Either a frame is still arriving, or a junk byte looks
+                    # like the header of a long frame; resync if a complete
+                    # frame is already waiting further on
+                    for resync in range(start + 1, len(buffer) - 3):
+                        if self.check_frame(buffer, view, resync)[0]:
+                            self.junk += view[start:resync]
+                            start = resync
+                            break
+                    else:
+                        break
+                    continue
+                
+                if length:
+                    if self.junk:
+                        frames.append(bytes(self.junk))
+                        self.junk.clear()
+                    frames.append(bytes(view[start:start + length]))
+                    start += length
+                else:
+                    # Not a frame start, skip one byte and try again
+                    self.junk.append(buffer[start])
+                    start += 1
+                
+                if len(self.junk) >= self.MAX_FRAME:
+                    frames.append(bytes(self.junk))
+                    self.junk.clear()
+        finally:
+            view.release()
+        del buffer[:start]
+        if start:
+            self.offset += start
+            self.checked = {position: needed for position, needed in self.checked.items()
+                            if position >= self.offset}
+        return frames
+
+class ProtocolDecoder:
+    """Base class for protocol decoder plugins
+    
+    A decoder pairs a framer, which splits the received byte stream into
+    frames, with decode(), which turns one frame into a record. Records are
+    dicts with "protocol", "fields" (an ordered dict of decoded values),
+    "error" (None for a valid frame) and "raw" (the frame bytes).
+    Add a decoder class to PROTOCOL_DECODERS to make it selectable.
+    """
+    name = ""
+    
+    def __init__(self):
+        self.framer = self.create_framer()
+    
+    def create_framer(self):
+        raise NotImplementedError
+    
+    def decode(self, frame):
+        raise NotImplementedError
+    
+    def reset(self):
+        self.framer.reset()
+    
+    def feed(self, data):
+        """Return records for all frames completed by data"""
+        records = []
+        for frame in self.framer.feed(data):
+            try:
+                records.append(self.decode(frame))
+            except Exception as e:
+                records.append(self.record(frame, {}, f"Decode error: {e}"))
+        return records
+    
+    def record(self, frame, fields, error=None):
+        return {"protocol": self.name, "fields": fields, "error": error, "raw": frame}
+
+class ModbusRtuDecoder(ProtocolDecoder):
+    """Modbus RTU requests and responses"""
+    name = "Modbus RTU"
+    ADDRESS_VALUE = struct.Struct('>HH')
+    
+    def __init__(self):
+        super().__init__()
+        # Precompiled register array layouts, keyed by register count
+        self.register_structs = {}
+    
+    def create_framer(self):
+        return ModbusRtuFramer()
+    
+    def registers(self, frame, offset, count):
+        layout = self.register_structs.get(count)
+        if layout is None:
+            layout = self.register_structs[count] = struct.Struct(f'>{count}H')
+        return list(layout.unpack_from(frame, offset))
+    
+    def decode(self, frame):
+        if len(frame) < 4 or modbus_crc16(frame) != 0:
+            return self.record(frame, {}, "CRC error")
+        
+        address, function = frame[0], frame[1]
+        fields = {
+            "address": address,
+            "function": MODBUS_FUNCTIONS.get(function & 0x7F, f"0x{function & 0x7F:02X}"),
+        }
+        payload_length = len(frame) - 4
+        
+        if function & 0x80:
+            fields["exception"] = MODBUS_EXCEPTIONS.get(frame[2], frame[2])
+        elif function in (3, 4) and frame[2] == payload_length - 1 and frame[2] % 2 == 0:
+            # Response: byte count followed by whole registers
+            fields["registers"] = self.registers(frame, 3, frame[2] // 2)
+        elif function in (1, 2) and frame[2] == payload_length - 1:
+            # Response: byte count followed by the bits. With a byte count of 3 the
+            # frame is as long as a request, so show both readings
+            if payload_length == 4:
+                fields["reading"] = "ambiguous (request or response)"
+                fields["start"], fields["quantity"] = self.ADDRESS_VALUE.unpack_from(frame, 2)
+            fields["data"] = frame[3:-2].hex(' ').upper()
+        elif function in (1, 2, 3, 4, 5, 6) and payload_length == 4:
+            start, value = self.ADDRESS_VALUE.unpack_from(frame, 2)
+            fields["start"] = start
+            fields["value" if function in (5, 6) else "quantity"] = value
+        elif function in (15, 16) and payload_length >= 4:
+            start, quantity = self.ADDRESS_VALUE.unpack_from(frame, 2)
+            fields["start"] = start
+            fields["quantity"] = quantity
+            if payload_length > 4:
+                # Request: byte count followed by the values
+                if function == 16:
+                    fields["registers"] = self.registers(frame, 7, frame[6] // 2)
+                else:
+                    fields["data"] = frame[7:-2].hex(' ').upper()
+        elif payload_length:
+            fields["data"] = frame[2:-2].hex(' ').upper()
+        return self.record(frame, fields)
+
+# Field names of common NMEA 0183 sentences, after the sentence identifier
+NMEA_SENTENCE_FIELDS = {
+    "GGA": ("time", "lat", "lat_dir", "lon", "lon_dir", "quality", "satellites",
+            "hdop", "altitude", "altitude_unit", "geoid_sep", "geoid_unit", "dgps_age", "dgps_station"),
+    "GLL": ("lat", "lat_dir", "lon", "lon_dir", "time", "status", "mode"),
+    "GSA": ("mode", "fix_type", "sv1", "sv2", "sv3", "sv4", "sv5", "sv6", "sv7", "sv8",
+            "sv9", "sv10", "sv11", "sv12", "pdop", "hdop", "vdop"),
+    "RMC": ("time", "status", "lat", "lat_dir", "lon", "lon_dir", "speed_knots",
+            "course", "date", "mag_var", "mag_var_dir", "mode"),
+    "VTG": ("course_true", "true", "course_mag", "magnetic", "speed_knots", "knots",
+            "speed_kmh", "kmh", "mode"),
+    "ZDA": ("time", "day", "month", "year", "zone_hours", "zone_minutes"),
+}
+
+class NmeaDecoder(ProtocolDecoder):
+    """NMEA 0183 sentences with checksum validation"""
+    name = "NMEA 0183"
+    
+    def create_framer(self):
+        return LineFramer(b'\n', max_length=256)
+    
+    def decode(self, frame):
+        sentence = frame.rstrip(b'\r')
+        if not sentence or sentence[0] not in b'$!':
+            return self.record(frame, {}, "Not an NMEA sentence")
+        
+        error = None
+        star = sentence.rfind(b'*')
+        if star < 0:
+            body = sentence[1:]
+        else:
+            body = sentence[1:star]
+            checksum = reduce(operator.xor, body, 0)
+            try:
+                expected = int(sentence[star + 1:star + 3], 16)
+            except ValueError:
+                expected = None
+            if checksum != expected:
+                error = f"Checksum error (got {checksum:02X})"
+        
+        parts = body.decode('ascii', errors='replace').split(',')
+        address = parts[0]
+        # Proprietary sentences ($P...) have no talker ID
+        talker, sentence_type = ("P", address[1:]) if address.startswith("P") else (address[:2], address[2:])
+        fields = {"talker": talker, "sentence": sentence_type}
+        names = NMEA_SENTENCE_FIELDS.get(sentence_type, ())
+        for index, value in enumerate(parts[1:]):
+            fields[names[index] if index < len(names) else f"field{index + 1}"] = value
+        return self.record(frame, fields, error)
+
+class StructDecoder(ProtocolDecoder):
+    """Fixed-length binary frames described by a struct format string"""
+    name = "Custom Struct"
+    
+    def __init__(self, layout, names="", sync=b''):
+        # Compile the layout once; decode() only calls unpack_from()
+        self.layout = struct.Struct(layout)
+        self.sync = sync
+        if self.layout.size == 0 and not sync:
+            # SyncFramer would never advance through the buffer
+            raise ValueError("Layout has no bytes; add fields or a sync pattern")
+        value_count = len(self.layout.unpack(bytes(self.layout.size)))
+        self.names = [name.strip() for name in names.split(',') if name.strip()]
+        if len(self.names) > value_count:
+            raise ValueError(f"{len(self.names)} field names for {value_count} values")
+        self.names += [f"field{index + 1}" for index in range(len(self.names), value_count)]
+        super().__init__()
+    
+    def create_framer(self):
+        return SyncFramer(self.layout.size, self.sync)
+    
+    def decode(self, frame):
+        values = self.layout.unpack_from(frame, len(self.sync))
+        fields = {}
+        for name, value in zip(self.names, values):
+            fields[name] = value.hex(' ').upper() if isinstance(value, bytes) else value
+        return self.record(frame, fields)
+
+PROTOCOL_DECODERS = {
+    ModbusRtuDecoder.name: ModbusRtuDecoder,
+    NmeaDecoder.name: NmeaDecoder,
+    StructDecoder.name: StructDecoder,
+}
+
 class SimpleSerialTerminal:
+    MAX_DECODED_ROWS = 500
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Simple Serial Terminal")
-        self.root.geometry("800x650")
+        self.root.geometry("800x850")
         
         # Serial connection variables
         self.ser = None
         self.connected = False
         self.selected_port = tk.StringVar()
         
+        # Serializes writes from the GUI and from TCP bridge clients
+        self.write_lock = threading.Lock()
+        
         # Message queue for thread-safe GUI updates
         self.message_queue = queue.Queue()
         
@@ -49,6 +782,20 @@ class SimpleSerialTerminal:
         self.log_file = None
         self.log_filename = None
         
+        # TCP sharing options
+        self.share_enabled = tk.BooleanVar(value=False)
+        self.share_port = tk.StringVar(value="7000")
+        self.share_rfc2217 = tk.BooleanVar(value=False)
+        self.share_allow_settings = tk.BooleanVar(value=True)
+        self.bridge = None
+        
+        # Protocol decoder options
+        self.decoder_name = tk.StringVar(value="None")
+        self.struct_format = tk.StringVar(value="<HHf")
+        self.struct_fields = tk.StringVar(value="")
+        self.struct_sync = tk.StringVar(value="")
+        self.decoder = None
+        
         # Create GUI elements
         self.create_widgets()
         
@@ -85,6 +832,9 @@ class SimpleSerialTerminal:
         # Terminal Display Frame
         self.create_terminal_frame(main_frame)
         
+        # Protocol Decoder Frame
+        self.create_decoder_frame(main_frame)
+        
     def create_connection_frame(self, parent):
         """Create connection settings frame"""
         conn_frame = ttk.LabelFrame(parent, text="Connection Settings", padding="10")
@@ -144,10 +894,34 @@ class SimpleSerialTerminal:
         timeout_entry.grid(row=0, column=9, padx=(0, 5))
         ttk.Label(row2_frame, text="s").grid(row=0, column=10, sticky=tk.W)
         
+        # Third row - TCP sharing
+        row3_frame = ttk.Frame(conn_frame)
+        row3_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        share_cb = ttk.Checkbutton(row3_frame, text="Share via TCP", 
+                                  variable=self.share_enabled,
+                                  command=self.toggle_sharing)
+        share_cb.grid(row=0, column=0, padx=(0, 15))
+        
+        ttk.Label(row3_frame, text="Port:").grid(row=0, column=1, sticky=tk.W, padx=(0, 5))
+        share_port_entry = ttk.Entry(row3_frame, textvariable=self.share_port, width=6)
+        share_port_entry.grid(row=0, column=2, padx=(0, 15))
+        
+        rfc2217_cb = ttk.Checkbutton(row3_frame, text="RFC 2217", 
+                                    variable=self.share_rfc2217)
+        rfc2217_cb.grid(row=0, column=3, padx=(0, 15))
+        
+        allow_settings_cb = ttk.Checkbutton(row3_frame, text="Allow remote settings", 
+                                           variable=self.share_allow_settings)
+        allow_settings_cb.grid(row=0, column=4, padx=(0, 15))
+        
+        self.share_status_label = ttk.Label(row3_frame, text="", font=('Arial', 8), foreground="gray")
+        self.share_status_label.grid(row=0, column=5, sticky=tk.W)
+        
         # Connection Status
         self.status_label = ttk.Label(conn_frame, text="Status: Disconnected", 
                                      foreground="red")
-        self.status_label.grid(row=2, column=0, sticky=tk.W)
+        self.status_label.grid(row=3, column=0, sticky=tk.W)
         
     def create_command_frame(self, parent):
         """Create command input frame"""
@@ -266,6 +1040,55 @@ class SimpleSerialTerminal:
         self.display_message("4. Use options to control line endings and hex formatting", "SYSTEM")
         self.display_message("", "SYSTEM")
     
+    def create_decoder_frame(self, parent):
+        """Create protocol decoder frame"""
+        decoder_frame = ttk.LabelFrame(parent, text="Protocol Decoder", padding="10")
+        decoder_frame.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        decoder_frame.columnconfigure(0, weight=1)
+        
+        # First row - Decoder selection and custom struct layout
+        options_frame = ttk.Frame(decoder_frame)
+        options_frame.grid(row=0, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        
+        ttk.Label(options_frame, text="Protocol:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        decoder_combo = ttk.Combobox(options_frame, textvariable=self.decoder_name, width=14,
+                                    values=["None"] + list(PROTOCOL_DECODERS), state="readonly")
+        decoder_combo.grid(row=0, column=1, padx=(0, 15))
+        decoder_combo.bind('<<ComboboxSelected>>', lambda e: self.apply_decoder())
+        
+        ttk.Label(options_frame, text="Struct:").grid(row=0, column=2, sticky=tk.W, padx=(0, 5))
+        ttk.Entry(options_frame, textvariable=self.struct_format, width=10).grid(row=0, column=3, padx=(0, 10))
+        
+        ttk.Label(options_frame, text="Fields:").grid(row=0, column=4, sticky=tk.W, padx=(0, 5))
+        ttk.Entry(options_frame, textvariable=self.struct_fields, width=18).grid(row=0, column=5, padx=(0, 10))
+        
+        ttk.Label(options_frame, text="Sync:").grid(row=0, column=6, sticky=tk.W, padx=(0, 5))
+        ttk.Entry(options_frame, textvariable=self.struct_sync, width=8).grid(row=0, column=7, padx=(0, 10))
+        
+        apply_btn = ttk.Button(options_frame, text="Apply", command=self.apply_decoder)
+        apply_btn.grid(row=0, column=8)
+        
+        # Decoded frames table
+        columns = ("time", "protocol", "fields", "status")
+        self.decoded_table = ttk.Treeview(decoder_frame, columns=columns, show="headings", height=6)
+        for column, heading, width, stretch in [("time", "Time", 90, False),
+                                                ("protocol", "Protocol", 90, False),
+                                                ("fields", "Fields", 400, True),
+                                                ("status", "Status", 150, False)]:
+            self.decoded_table.heading(column, text=heading, anchor=tk.W)
+            self.decoded_table.column(column, width=width, stretch=stretch, anchor=tk.W)
+        self.decoded_table.tag_configure("error", foreground="red")
+        self.decoded_table.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        
+        table_scroll = ttk.Scrollbar(decoder_frame, orient=tk.VERTICAL, command=self.decoded_table.yview)
+        table_scroll.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.decoded_table.configure(yscrollcommand=table_scroll.set)
+        
+        # Info text
+        info_text = "Struct layouts use Python struct format (e.g. <HHf), comma-separated field names and an optional hex sync pattern (e.g. AA 55)."
+        ttk.Label(decoder_frame, text=info_text, font=('Arial', 8), foreground="gray").grid(
+            row=2, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
+    
     def refresh_com_ports(self):
         """Refresh the list of available COM ports"""
         try:
@@ -341,8 +1164,16 @@ class SimpleSerialTerminal:
                 settings_info = f"{baudrate}-{bytesize}-{self.parity.get()}-{stopbits}, Timeout: {timeout}s"
                 self.display_message(f"Successfully connected to {port_name} ({settings_info})", "SUCCESS")
                 
+                # Drop partial frames from a previous connection
+                if self.decoder:
+                    self.decoder.reset()
+                
                 # Start background thread to read incoming data
                 self.start_read_thread()
+                
+                # Share the port with TCP clients if requested
+                if self.share_enabled.get():
+                    self.start_sharing()
             else:
                 self.display_message("Failed to open serial port", "ERROR")
                 
@@ -360,6 +1191,9 @@ class SimpleSerialTerminal:
             # Give the read thread a moment to stop
             time.sleep(0.1)
             
+            # Disconnect TCP clients before the port goes away
+            self.stop_sharing()
+            
             # Now close the serial port
             if self.ser and self.ser.is_open:
                 self.ser.close()
@@ -372,6 +1206,82 @@ class SimpleSerialTerminal:
         except Exception as e:
             self.display_message(f"Disconnect error: {e}", "ERROR")
     
+    def refresh_port_settings(self):
+        """Show the open port's current settings in the settings fields"""
+        if self.ser and self.ser.is_open:
+            self.baudrate.set(str(self.ser.baudrate))
+            self.bytesize.set(str(self.ser.bytesize))
+            self.parity.set(self.ser.parity)
+            self.stopbits.set(f"{self.ser.stopbits:g}")
+    
+    def toggle_sharing(self):
+        """Start or stop sharing the open port over TCP"""
+        if not self.connected:
+            # Sharing starts automatically on connect
+            return
+        if self.share_enabled.get():
+            self.start_sharing()
+        else:
+            self.stop_sharing()
+    
+    def start_sharing(self):
+        """Start the TCP bridge for the open serial port"""
+        try:
+            port = int(self.share_port.get())
+        except ValueError:
+            self.share_enabled.set(False)
+            messagebox.showerror("Error", "Invalid TCP port")
+            return
+        
+        try:
+            self.bridge = SerialBridge(
+                self.ser,
+                self.write_lock,
+                port=port,
+                rfc2217=self.share_rfc2217.get(),
+                notify=lambda message, msg_type: self.message_queue.put(("STATUS", message, msg_type)),
+                allow_settings=self.share_allow_settings.get(),
+                on_settings_change=lambda: self.message_queue.put(("PORT_SETTINGS",))
+            )
+            self.bridge.start()
+            mode = " (RFC 2217)" if self.bridge.rfc2217 else ""
+            self.display_message(f"Sharing port on {self.bridge.host}:{self.bridge.port}{mode}", "SYSTEM")
+        except Exception as e:
+            self.bridge = None
+            self.share_enabled.set(False)
+            self.share_status_label.config(text="")
+            self.display_message(f"Failed to start TCP sharing: {e}", "ERROR")
+    
+    def stop_sharing(self):
+        """Stop the TCP bridge and disconnect all clients"""
+        if self.bridge:
+            self.bridge.stop()
+            self.bridge = None
+            self.share_status_label.config(text="")
+            self.display_message("TCP sharing stopped", "SYSTEM")
+    
+    def apply_decoder(self):
+        """Create the selected protocol decoder"""
+        name = self.decoder_name.get()
+        if name not in PROTOCOL_DECODERS:
+            self.decoder = None
+            self.display_message("Protocol decoder disabled", "SYSTEM")
+            return
+        
+        try:
+            if name == StructDecoder.name:
+                sync = bytes.fromhex(self.struct_sync.get().replace("0x", ""))
+                decoder = StructDecoder(self.struct_format.get(), self.struct_fields.get(), sync)
+            else:
+                decoder = PROTOCOL_DECODERS[name]()
+        except (ValueError, struct.error) as e:
+            messagebox.showerror("Error", f"Invalid decoder settings: {e}")
+            return
+        
+        # The read thread picks up the new decoder on its next chunk
+        self.decoder = decoder
+        self.display_message(f"Protocol decoder: {name}", "SYSTEM")
+    
     def toggle_logging(self):
         """Toggle logging on/off"""
         if self.enable_logging.get():
@@ -427,11 +1337,18 @@ class SimpleSerialTerminal:
     
     def log_to_file(self, message):
         """Log a message to the file if logging is enabled"""
+        self.log_lines_to_file((message,))
+    
+    def log_lines_to_file(self, messages):
+        """Log several messages with one write, e.g. a batch of decoded frames
+        
+        messages may be a generator; it is not consumed when logging is disabled.
+        """
         if self.enable_logging.get() and self.log_file:
             try:
                 timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
-                log_entry = f"[{timestamp}] {message}\n"
-                self.log_file.write(log_entry)
+                log_entries = "".join(f"[{timestamp}] {message}\n" for message in messages)
+                self.log_file.write(log_entries)
                 self.log_file.flush()  # Ensure immediate write
             except Exception as e:
                 # If logging fails, disable it to prevent repeated errors
@@ -558,7 +1475,8 @@ class SimpleSerialTerminal:
                 data += b'\r\n'
             
             # Send data
-            self.ser.write(data)
+            with self.write_lock:
+                self.ser.write(data)
             
             # Display sent command
             ending_info = f" + {self.line_ending.get()}" if self.line_ending.get() != "None" else ""
@@ -582,6 +1500,15 @@ class SimpleSerialTerminal:
                         data = self.ser.read(self.ser.in_waiting)
                         if data:
                             self.message_queue.put(("RECEIVED_DATA", data))
+                            bridge = self.bridge
+                            if bridge:
+                                bridge.publish(data)
+                            decoder = self.decoder
+                            if decoder:
+                                records = decoder.feed(data)
+                                if records:
+                                    timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
+                                    self.message_queue.put(("DECODED", timestamp, records))
                     time.sleep(0.05)  # Small delay to prevent excessive CPU usage
                 except Exception as e:
                     # Only report error if we're still supposed to be connected
@@ -618,10 +1545,43 @@ class SimpleSerialTerminal:
     def clear_terminal(self):
         """Clear the terminal display"""
         self.terminal_text.delete(1.0, tk.END)
+        self.decoded_table.delete(*self.decoded_table.get_children())
         self.display_message("Terminal cleared", "SYSTEM")
     
+    def show_decoded(self, batches):
+        """Add (timestamp, records) batches to the table and log them as JSON"""
+        self.log_lines_to_file("DECODED: " + json.dumps({
+            "time": timestamp,
+            "protocol": record["protocol"],
+            "valid": record["error"] is None,
+            "error": record["error"],
+            "fields": record["fields"],
+            "raw": record["raw"].hex(' ').upper(),
+        }) for timestamp, records in batches for record in records)
+        
+        # Only the newest rows are kept, so skip records that would be trimmed anyway
+        newest = []
+        for timestamp, records in reversed(batches):
+            newest[:0] = [(timestamp, record) for record in records[-(self.MAX_DECODED_ROWS - len(newest)):]]
+            if len(newest) >= self.MAX_DECODED_ROWS:
+                break
+        for timestamp, record in newest:
+            fields = " ".join(f"{name}={value}" for name, value in record["fields"].items())
+            if not fields:
+                fields = record["raw"].hex(' ').upper()
+            self.decoded_table.insert("", tk.END,
+                                      values=(timestamp, record["protocol"], fields, record["error"] or "OK"),
+                                      tags=("error",) if record["error"] else ())
+        
+        rows = self.decoded_table.get_children()
+        if len(rows) > self.MAX_DECODED_ROWS:
+            self.decoded_table.delete(*rows[:len(rows) - self.MAX_DECODED_ROWS])
+        self.decoded_table.see(rows[-1])
+    
     def process_messages(self):
         """Process messages from the queue (runs in main thread)"""
+        # Decoded records from all reads in this tick are shown together
+        decoded = []
         try:
             while True:
                 message_data = self.message_queue.get_nowait()
@@ -667,9 +1627,33 @@ class SimpleSerialTerminal:
                     _, message = message_data
                     self.display_message(message, "ERROR")
                     
+                elif message_data[0] == "STATUS":
+                    _, message, msg_type = message_data
+                    self.display_message(message, msg_type)
+                    
+                elif message_data[0] == "PORT_SETTINGS":
+                    # An RFC 2217 client reconfigured the port
+                    self.refresh_port_settings()
+                    
+                elif message_data[0] == "DECODED":
+                    _, timestamp, records = message_data
+                    decoded.append((timestamp, records))
+                    
         except queue.Empty:
             pass
         
+        if decoded:
+            self.show_decoded(decoded)
+        
+        # Update TCP sharing status
+        if self.bridge:
+            stats = self.bridge.client_stats()
+            dropped = sum(dropped_bytes for _, _, dropped_bytes in stats)
+            status = f"{self.bridge.host}:{self.bridge.port}, {len(stats)} client(s)"
+            if dropped:
+                status += f", {dropped} bytes dropped"
+            self.share_status_label.config(text=status, foreground="red" if dropped else "green")
+        
         # Schedule next check
         self.root.after(100, self.process_messages)
     
@@ -17,13 +17,17 @@ a = Analysis(
         'serial',
         'serial.tools',
         'serial.tools.list_ports',
+        'serial.rfc2217',
         'tkinter',
         'tkinter.ttk',
         'tkinter.scrolledtext',
         'tkinter.messagebox',
         'queue',
+        'socket',
         'threading',
-        'datetime'
+        'datetime',
+        'json',
+        'struct'
     ],
     hookspath=[],
     hooksconfig={},
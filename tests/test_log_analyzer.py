@@ -0,0 +1,136 @@
+"""
+Tests for the offline log analyzer, using a small generated log
+"""
+
+import importlib.util
+import io
+import os
+import re
+import tempfile
+import unittest
+from collections import Counter
+
+# log-analyzer.py is a script, not an importable module name
+_spec = importlib.util.spec_from_file_location(
+    "log_analyzer", os.path.join(os.path.dirname(__file__), "..", "log-analyzer.py"))
+log_analyzer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(log_analyzer)
+
+LOG_LINES = [
+    b"[2025-07-31 14:30:00.000] SYSTEM: === Session started ===\n",
+    b"[2025-07-31 14:30:00.100] SENT: TEXT: reset\n",
+    # Only the type at the start of the line counts, not one quoted in the data
+    b"[2025-07-31 14:30:00.250] RECEIVED: TEXT: [boot] ERROR: flash not found\n",
+    b"[2025-07-31 14:30:00.900] RECEIVED: TEXT: ok\n",
+    b"[2025-07-31 14:30:01.050] ERROR: Read error: timeout\n",
+    b'[2025-07-31 14:30:01.500] DECODED: {"protocol": "NMEA 0183", "valid": true}\n',
+    b"[2025-07-31 14:30:08.000] RECEIVED: TEXT: back\n",
+    b"[2025-07-31 14:30:08.400] SUCCESS: Connected\n",
+    b"[2025-07-31 14:30:09.000] INFO: Logging started\n",
+    b"[2025-07-31 14:30:20.000] RECEIVED: TEXT: late\n",
+    b"[2025-07-31 14:30:20.999] RECEIVED: TEXT: later\n",
+    b"[2025-07-31 14:30:21.001] SENT: TEXT: ping\n",
+    b"[2025-07-31 14:30:21.200] SYSTEM: === Session ended ===\n",
+]
+LOG = b"".join(LOG_LINES)
+
+
+def epoch_ms(stamp):
+    """Milliseconds for a 'YYYY-MM-DD HH:MM:SS.mmm' log timestamp"""
+    second, millis = stamp.split(".")
+    return log_analyzer.to_epoch(second.encode("ascii")) * 1000 + int(millis)
+
+
+class LogAnalyzerTest(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "terminal_log.txt")
+        with open(self.path, "wb") as f:
+            f.write(LOG)
+        self.options = {
+            "raw": False,
+            "interval": 1,
+            "gap_ms": 5000,
+            "patterns": [rb"TEXT: "],
+            "grep": None,
+            "since": None,
+            "until": None,
+            "slice_path": None,
+        }
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def analyze(self, boundaries):
+        """Analyze the log split at the given line indexes and merge the results"""
+        offsets = [sum(len(line) for line in LOG_LINES[:index]) for index in boundaries]
+        chunks = zip([0] + offsets, offsets + [len(LOG)])
+        results = [log_analyzer.analyze_chunk(self.path, start, end, self.options) for start, end in chunks]
+        return log_analyzer.merge_results(results, self.options)
+
+    def check_summary(self, merged):
+        self.assertEqual(merged["types"], Counter({
+            "RECEIVED": 5, "SENT": 2, "SYSTEM": 2, "ERROR": 1, "DECODED": 1, "SUCCESS": 1, "INFO": 1}))
+        self.assertEqual(merged["entries"], len(LOG_LINES))
+        self.assertEqual(merged["seconds"][epoch_ms("2025-07-31 14:30:00.000") // 1000, "RECEIVED"], 2)
+        self.assertEqual(merged["seconds"][epoch_ms("2025-07-31 14:30:20.000") // 1000, "RECEIVED"], 2)
+        self.assertEqual(merged["pattern_hits"][rb"TEXT: "], 7)
+        self.assertEqual(merged["first_ms"], epoch_ms("2025-07-31 14:30:00.000"))
+        self.assertEqual(merged["last_ms"], epoch_ms("2025-07-31 14:30:21.200"))
+        self.assertEqual(merged["gaps"], [
+            (epoch_ms("2025-07-31 14:30:01.500"), epoch_ms("2025-07-31 14:30:08.000")),
+            (epoch_ms("2025-07-31 14:30:09.000"), epoch_ms("2025-07-31 14:30:20.000")),
+        ])
+
+    def test_single_chunk(self):
+        self.check_summary(self.analyze([]))
+
+    def test_any_chunk_split_gives_the_same_summary(self):
+        # Includes splits on a gap and inside runs of lines from the same second
+        for boundary in range(1, len(LOG_LINES)):
+            with self.subTest(boundary=boundary):
+                self.check_summary(self.analyze([boundary]))
+        self.check_summary(self.analyze(range(1, len(LOG_LINES))))
+
+    def test_small_blocks_give_the_same_summary(self):
+        block_size = log_analyzer.BLOCK_SIZE
+        log_analyzer.BLOCK_SIZE = 64
+        try:
+            self.check_summary(self.analyze([4, 9]))
+        finally:
+            log_analyzer.BLOCK_SIZE = block_size
+
+    def write_slice(self, grep=None, since=None, until=None):
+        out = io.BytesIO()
+        log_analyzer.write_slice(LOG, re.compile(grep) if grep else None,
+                                 log_analyzer.parse_time(since) if since else None,
+                                 log_analyzer.parse_time(until) if until else None, out)
+        return out.getvalue()
+
+    def test_slice_by_time(self):
+        self.assertEqual(self.write_slice(since="2025-07-31 14:30:08", until="2025-07-31 14:30:20"),
+                         b"".join(LOG_LINES[6:9]))
+        self.assertEqual(self.write_slice(since="2025-07-31 14:30:20.999"), b"".join(LOG_LINES[10:]))
+        self.assertEqual(self.write_slice(until="2025-07-31 14:30:00.250"), b"".join(LOG_LINES[:2]))
+
+    def test_slice_by_grep(self):
+        self.assertEqual(self.write_slice(grep=rb"ERROR"), LOG_LINES[2] + LOG_LINES[4])
+        self.assertEqual(self.write_slice(grep=rb"ERROR", since="2025-07-31 14:30:01"), LOG_LINES[4])
+        # Lines with several matches are written once
+        self.assertEqual(self.write_slice(grep=rb"[0-9]", until="2025-07-31 14:30:01"),
+                         b"".join(LOG_LINES[:4]))
+
+    def test_slice_across_chunks(self):
+        self.options["grep"] = rb"RECEIVED"
+        self.options["since"] = log_analyzer.parse_time("2025-07-31 14:30:01")
+        middle = sum(len(line) for line in LOG_LINES[:7])
+        parts = []
+        for index, (start, end) in enumerate([(0, middle), (middle, len(LOG))]):
+            self.options["slice_path"] = os.path.join(self.tempdir.name, f"slice.part{index}")
+            log_analyzer.analyze_chunk(self.path, start, end, self.options)
+            with open(self.options["slice_path"], "rb") as f:
+                parts.append(f.read())
+        self.assertEqual(parts, [LOG_LINES[6], LOG_LINES[9] + LOG_LINES[10]])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Tests for the protocol decoders and their framers
+"""
+
+import importlib.util
+import os
+import struct
+import unittest
+
+# simple-terminal.py is a script, not an importable module name
+_spec = importlib.util.spec_from_file_location(
+    "simple_terminal", os.path.join(os.path.dirname(__file__), "..", "simple-terminal.py"))
+simple_terminal = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(simple_terminal)
+
+
+def reference_crc16(data, crc=0xFFFF):
+    """Bitwise Modbus CRC-16"""
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+    return crc
+
+
+def modbus_frame(*payload):
+    """Append the CRC to a Modbus RTU payload"""
+    data = bytes(payload)
+    return data + struct.pack('<H', reference_crc16(data))
+
+
+class ModbusCrcTest(unittest.TestCase):
+    def test_matches_bitwise_reference(self):
+        data = bytes(range(256)) * 2
+        for length in (0, 1, 2, 7, 8, 255, 256, 511):
+            self.assertEqual(simple_terminal.modbus_crc16(data[:length]), reference_crc16(data[:length]))
+            # Odd offsets into a memoryview, as used by the framer
+            view = memoryview(data)[1:length + 1]
+            self.assertEqual(simple_terminal.modbus_crc16(view), reference_crc16(view))
+
+    def test_chained_with_seed(self):
+        data = bytes(range(37))
+        for split in (0, 1, 8, 17, 36):
+            crc = simple_terminal.modbus_crc16(data[:split])
+            self.assertEqual(simple_terminal.modbus_crc16(data[split:], crc), reference_crc16(data))
+
+    def test_frame_with_crc_yields_zero(self):
+        self.assertEqual(simple_terminal.modbus_crc16(modbus_frame(1, 3, 0, 0, 0, 10)), 0)
+
+
+class ModbusRtuFramerTest(unittest.TestCase):
+    FRAMES = [
+        modbus_frame(1, 3, 0, 0x10, 0, 2),
+        modbus_frame(1, 3, 4, 0, 42, 1, 0),
+        modbus_frame(1, 0x83, 2),
+        modbus_frame(1, 16, 0, 1, 0, 2, 4, 0, 1, 0, 2),
+        modbus_frame(1, 16, 0, 1, 0, 2),
+    ]
+    # Looks like the header of a 255-byte response, so the framer has to resync
+    LONG_HEADER_JUNK = b'\x01\x03\xfa\x00'
+
+    def feed_in_pieces(self, data, size):
+        framer = simple_terminal.ModbusRtuFramer()
+        frames = []
+        for index in range(0, len(data), size):
+            frames += framer.feed(data[index:index + size])
+        return frames
+
+    def test_same_frames_for_any_piece_size(self):
+        stream = (self.FRAMES[0] + b'\x00\x00\x00' + self.FRAMES[1] + self.LONG_HEADER_JUNK
+                  + self.FRAMES[2] + self.FRAMES[3] + b'\x00' + self.FRAMES[4])
+        expected = [self.FRAMES[0], b'\x00\x00\x00', self.FRAMES[1], self.LONG_HEADER_JUNK,
+                    self.FRAMES[2], self.FRAMES[3], b'\x00', self.FRAMES[4]]
+
+        self.assertEqual(self.feed_in_pieces(stream, len(stream)), expected)
+        for size in (1, 2, 3, 5, 16):
+            self.assertEqual(self.feed_in_pieces(stream, size), expected, f"pieces of {size} bytes")
+
+    def test_reset_forgets_partial_frame(self):
+        framer = simple_terminal.ModbusRtuFramer()
+        self.assertEqual(framer.feed(self.FRAMES[1][:5]), [])
+        framer.reset()
+        self.assertEqual(framer.feed(self.FRAMES[0]), [self.FRAMES[0]])
+
+
+class ModbusRtuDecoderTest(unittest.TestCase):
+    def setUp(self):
+        self.decoder = simple_terminal.ModbusRtuDecoder()
+
+    def test_read_request_with_start_high_byte_3(self):
+        record = self.decoder.decode(modbus_frame(1, 3, 3, 0, 0, 10))
+        self.assertIsNone(record["error"])
+        self.assertEqual(record["fields"]["start"], 768)
+        self.assertEqual(record["fields"]["quantity"], 10)
+        self.assertNotIn("registers", record["fields"])
+
+    def test_read_registers_response(self):
+        record = self.decoder.decode(modbus_frame(1, 3, 4, 0, 42, 1, 0))
+        self.assertEqual(record["fields"]["registers"], [42, 256])
+
+    def test_ambiguous_read_coils_frame(self):
+        for function in (1, 2):
+            record = self.decoder.decode(modbus_frame(1, function, 3, 0, 0, 10))
+            self.assertIsNone(record["error"])
+            self.assertIn("ambiguous", record["fields"]["reading"])
+            self.assertEqual(record["fields"]["start"], 768)
+            self.assertEqual(record["fields"]["quantity"], 10)
+            self.assertEqual(record["fields"]["data"], "00 00 0A")
+
+    def test_crc_error(self):
+        frame = bytearray(modbus_frame(1, 3, 0, 0, 0, 10))
+        frame[-1] ^= 0xFF
+        self.assertEqual(self.decoder.decode(bytes(frame))["error"], "CRC error")
+
+
+class NmeaDecoderTest(unittest.TestCase):
+    SENTENCE = b"$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47\r\n"
+
+    def test_checksum_pass(self):
+        records = simple_terminal.NmeaDecoder().feed(self.SENTENCE)
+        self.assertEqual(len(records), 1)
+        self.assertIsNone(records[0]["error"])
+        self.assertEqual(records[0]["fields"]["sentence"], "GGA")
+        self.assertEqual(records[0]["fields"]["lat"], "4807.038")
+
+    def test_checksum_fail(self):
+        records = simple_terminal.NmeaDecoder().feed(self.SENTENCE.replace(b"*47", b"*48"))
+        self.assertEqual(records[0]["error"], "Checksum error (got 47)")
+
+
+class StructDecoderTest(unittest.TestCase):
+    def test_empty_layout_without_sync_is_rejected(self):
+        with self.assertRaises(ValueError):
+            simple_terminal.StructDecoder("")
+        with self.assertRaises(ValueError):
+            simple_terminal.StructDecoder("<")
+
+    def test_decode_with_sync(self):
+        decoder = simple_terminal.StructDecoder("<Hh", "id, value", sync=b'\xaa\x55')
+        records = decoder.feed(b'\x00\xaa\x55\x01\x00\xfe\xff')
+        self.assertEqual(records[-1]["fields"], {"id": 1, "value": -2})
+
+
+if __name__ == "__main__":
+    unittest.main()
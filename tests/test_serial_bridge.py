@@ -0,0 +1,163 @@
+"""
+Tests for the TCP serial bridge, using a pseudo-terminal as the serial port
+"""
+
+import importlib.util
+import os
+import socket
+import threading
+import time
+import unittest
+
+import serial
+
+# simple-terminal.py is a script, not an importable module name
+_spec = importlib.util.spec_from_file_location(
+    "simple_terminal", os.path.join(os.path.dirname(__file__), "..", "simple-terminal.py"))
+simple_terminal = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(simple_terminal)
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() is true or the timeout expires"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+@unittest.skipUnless(hasattr(os, "openpty"), "requires a pseudo-terminal")
+class SerialBridgeTest(unittest.TestCase):
+    def setUp(self):
+        self.master, slave = os.openpty()
+        self.ser = serial.Serial(os.ttyname(slave), 115200, timeout=0.1)
+        os.close(slave)
+        self.messages = []
+        self.settings_changes = []
+        self.sockets = []
+
+    def tearDown(self):
+        for sock in self.sockets:
+            sock.close()
+        self.bridge.stop()
+        self.ser.close()
+        os.close(self.master)
+
+    def start_bridge(self, **kwargs):
+        self.bridge = simple_terminal.SerialBridge(
+            self.ser, threading.Lock(), port=0,
+            notify=lambda message, msg_type: self.messages.append((msg_type, message)),
+            on_settings_change=lambda: self.settings_changes.append(True),
+            **kwargs)
+        self.bridge.start()
+
+    def connect(self, count=1):
+        clients = []
+        for _ in range(count):
+            sock = socket.create_connection((self.bridge.host, self.bridge.port), timeout=5)
+            self.sockets.append(sock)
+            clients.append(sock)
+        self.assertTrue(wait_for(lambda: len(self.bridge.clients) == len(self.sockets)))
+        return clients
+
+    def receive(self, sock, size):
+        data = b''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def test_every_client_gets_a_copy(self):
+        self.start_bridge(queue_size=4)
+        first, second = self.connect(2)
+
+        os.write(self.master, b"hello")
+        self.assertTrue(wait_for(lambda: self.ser.in_waiting >= 5))
+        self.bridge.publish(self.ser.read(self.ser.in_waiting))
+
+        self.assertEqual(self.receive(first, 5), b"hello")
+        self.assertEqual(self.receive(second, 5), b"hello")
+
+    def test_client_writes_reach_the_port(self):
+        self.start_bridge(queue_size=4)
+        first, second = self.connect(2)
+
+        first.sendall(b"from first;")
+        self.assertEqual(os.read(self.master, 100), b"from first;")
+        second.sendall(b"from second;")
+        self.assertEqual(os.read(self.master, 100), b"from second;")
+
+    def test_slow_client_loss_is_counted_and_reported(self):
+        self.start_bridge(queue_size=2)
+        slow, = self.connect()
+        slow_address = "%s:%d" % slow.getsockname()
+
+        # The client never reads, so its socket buffers and then its queue fill up
+        chunk = b"x" * 65536
+        for _ in range(200):
+            self.bridge.publish(chunk)
+
+        stats = {address: dropped for address, _, dropped in self.bridge.client_stats()}
+        self.assertGreater(stats[slow_address], 0)
+        self.assertTrue(any(msg_type == "ERROR" and slow_address in message and "too slow" in message
+                            for msg_type, message in self.messages))
+
+        # The total loss is reported again when the client disconnects
+        slow.close()
+        self.assertTrue(wait_for(lambda: any("disconnected" in message and "dropped" in message
+                                             for _, message in self.messages)))
+
+    def test_rfc2217_settings_change_is_reported(self):
+        self.start_bridge(rfc2217=True)
+        client = serial.serial_for_url(f"rfc2217://{self.bridge.host}:{self.bridge.port}",
+                                       baudrate=9600, timeout=2)
+        try:
+            self.assertEqual(self.ser.baudrate, 9600)
+            self.assertTrue(self.settings_changes)
+            self.assertTrue(any("changed baudrate to 9600" in message for _, message in self.messages))
+        finally:
+            client.close()
+
+    def test_rfc2217_settings_change_can_be_refused(self):
+        self.start_bridge(rfc2217=True, allow_settings=False)
+        with self.assertRaises(ValueError):
+            serial.serial_for_url(f"rfc2217://{self.bridge.host}:{self.bridge.port}",
+                                  baudrate=9600, timeout=2)
+        self.assertEqual(self.ser.baudrate, 115200)
+        self.assertFalse(self.settings_changes)
+        self.assertTrue(any(msg_type == "ERROR" and "refused" in message for msg_type, message in self.messages))
+
+    def test_rfc2217_connect_keeps_buffered_data(self):
+        self.start_bridge(rfc2217=True)
+        os.write(self.master, b"unread by the terminal")
+        self.assertTrue(wait_for(lambda: self.ser.in_waiting == 22))
+
+        # pySerial purges both buffers when it opens an rfc2217:// port
+        client = serial.serial_for_url(f"rfc2217://{self.bridge.host}:{self.bridge.port}", timeout=2)
+        try:
+            self.assertEqual(self.ser.in_waiting, 22)
+            self.assertEqual(self.ser.read(22), b"unread by the terminal")
+        finally:
+            client.close()
+
+    def test_rfc2217_control_lines_are_reported_or_refused(self):
+        self.start_bridge(rfc2217=True, allow_settings=False)
+        client = serial.serial_for_url(f"rfc2217://{self.bridge.host}:{self.bridge.port}",
+                                       baudrate=115200, timeout=2)
+        try:
+            client.dtr = False
+            self.assertTrue(wait_for(lambda: any(
+                msg_type == "ERROR" and "refused changing dtr" in message
+                for msg_type, message in self.messages)))
+            self.assertTrue(self.ser.dtr)
+        finally:
+            client.close()
+        self.assertFalse(self.settings_changes)
+
+
+if __name__ == "__main__":
+    unittest.main()